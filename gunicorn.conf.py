@@ -0,0 +1,35 @@
+"""
+Configuración de Gunicorn para el Trading API Server
+
+Uso: gunicorn -c gunicorn.conf.py trading_api_server:app
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Los endpoints son proxies de I/O hacia Alpaca: los workers gevent
+# multiplexan muchas peticiones concurrentes en un solo event loop, de modo
+# que el límite de concurrencia es workers * worker_connections (greenlets),
+# no el número de workers
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', 1000))
+timeout = 30
+
+# Importar la app una sola vez en el maestro: los workers comparten por
+# copy-on-write el código ya cargado y la configuración leída al importar
+preload_app = True
+
+
+def post_fork(server, worker):
+    # La sesión HTTP creada en el maestro no debe compartirse entre procesos
+    import trading_api_server
+    trading_api_server.reset_alpaca_session()
+
+
+def post_worker_init(worker):
+    # Calentar la conexión con Alpaca antes de la primera petición del worker
+    import trading_api_server
+    trading_api_server.prewarm_alpaca()
@@ -4,17 +4,74 @@ Este servidor expone endpoints seguros que tu GPT puede llamar
 
 Autor: Manus AI
 Fecha: 23 de octubre de 2025
+
+Producción:
+    gunicorn -c gunicorn.conf.py trading_api_server:app
 """
 
+# gevent debe parchear sockets/ssl antes de importar alpaca_trade_api
+# (requests/urllib3), para que las llamadas a Alpaca no bloqueen el worker
+from gevent import monkey
+monkey.patch_all()
+
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
+from cachetools import LRUCache, TTLCache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import alpaca_trade_api as tradeapi
+from alpaca_trade_api.entity import Position
+from alpaca_trade_api.entity_v2 import QuoteV2, TradeV2
+from alpaca_trade_api.rest import APIError
+import hashlib
+import numpy as np
+import orjson
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, List, Sequence
+
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+def _json_default(obj):
+    """Tipos que orjson no serializa de forma nativa"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+class OrjsonProvider(JSONProvider):
+    """Proveedor JSON de Flask basado en orjson (más rápido que json estándar)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_json_default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Evita decodificar a str: orjson ya entrega los bytes del cuerpo
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_json_default, option=ORJSON_OPTIONS)
+        return self._app.response_class(body, mimetype='application/json')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Permitir llamadas desde el GPT
 
+# Comprimir respuestas JSON (barras, órdenes); las pequeñas se envían tal cual
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
 # Configuración de Alpaca (usando variables de entorno por seguridad)
 ALPACA_API_KEY = os.getenv('ALPACA_API_KEY', 'TU_ALPACA_KEY')
 ALPACA_SECRET_KEY = os.getenv('ALPACA_SECRET_KEY', 'TU_ALPACA_SECRET')
@@ -28,99 +85,380 @@ alpaca = tradeapi.REST(
     api_version='v2'
 )
 
+def _configure_session(session):
+    """Pool de conexiones persistentes (keep-alive) para las llamadas a Alpaca"""
+    # alpaca_trade_api ya reintenta 429/504 por su cuenta; aquí solo 502/503
+    retries = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=retries)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+
+_configure_session(alpaca._session)
+
+def reset_alpaca_session():
+    """
+    Crea una sesión HTTP nueva para el cliente de Alpaca
+    
+    Con `preload_app` de Gunicorn el cliente se crea en el proceso maestro;
+    cada worker debe abrir sus propias conexiones en lugar de heredar el
+    pool de sockets del maestro.
+    """
+    old_session = alpaca._session
+    alpaca._session = requests.Session()
+    _configure_session(alpaca._session)
+    old_session.close()
+
+# Cachés en memoria para datos que cambian poco (reloj y calendario del mercado).
+# Guardan el cuerpo JSON ya serializado para no repetir la serialización.
+clock_cache = TTLCache(maxsize=8, ttl=30)
+calendar_cache = TTLCache(maxsize=32, ttl=3600)
+clock_lock = threading.Lock()
+calendar_lock = threading.Lock()
+
+def _cached_json(cache, lock, key, build):
+    """Devuelve una respuesta JSON desde la caché, construyéndola si expiró"""
+    with lock:
+        body = cache.get(key)
+    
+    if body is None:
+        # La llamada a Alpaca se hace fuera del lock: un fallo lento para una
+        # clave no bloquea a las demás, y las peticiones simultáneas con la
+        # misma clave comparten una sola llamada
+        body = _single_flight(
+            (id(cache), key),
+            lambda: orjson.dumps(build(), default=_json_default, option=ORJSON_OPTIONS)
+        )
+        with lock:
+            cache[key] = body
+    return app.response_class(body, mimetype='application/json')
+
+# Llamadas a Alpaca en curso, por clave. Las peticiones simultáneas con la
+# misma clave esperan el resultado de la primera en lugar de repetir la llamada.
+inflight = {}
+inflight_lock = threading.Lock()
+
+def _single_flight(key, fn, *args):
+    """Ejecuta fn(*args) una sola vez para todas las peticiones concurrentes con la misma clave"""
+    with inflight_lock:
+        future = inflight.get(key)
+        owner = future is None
+        if owner:
+            future = inflight[key] = Future()
+    
+    if owner:
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # gevent.Timeout/GreenletExit van dirigidos solo a este greenlet: los
+            # que esperan reciben un error normal en lugar de la misma excepción
+            future.set_exception(RuntimeError('upstream call aborted'))
+            raise
+        finally:
+            with inflight_lock:
+                inflight.pop(key, None)
+    return future.result()
+
+# Caché de últimas operaciones por símbolo: absorbe las ráfagas de consultas del GPT
+price_cache = TTLCache(maxsize=1024, ttl=0.5)
+
+def _latest_trade(symbol):
+    """Última operación de un símbolo, servida desde caché si es reciente"""
+    trade = price_cache.get(symbol)
+    if trade is None:
+        trade = _single_flight(('trade', symbol), alpaca.get_latest_trade, symbol)
+        price_cache[symbol] = trade
+    return trade
+
+def _latest_trades(symbols):
+    """Últimas operaciones de varios símbolos con una sola llamada a Alpaca"""
+    trades = {}
+    missing = []
+    for symbol in symbols:
+        trade = price_cache.get(symbol)
+        if trade is None:
+            missing.append(symbol)
+        else:
+            trades[symbol] = trade
+    
+    if missing:
+        fetched = alpaca.get_latest_trades(missing)
+        price_cache.update(fetched)
+        trades.update(fetched)
+    return trades
+
+def _api_error(e):
+    """Respuesta de error con el mensaje y el código HTTP que devolvió Alpaca"""
+    status = e.status_code or 400
+    return jsonify({'error': str(e), 'code': status}), status
+
+def _internal_error(e):
+    """Respuesta de error sin exponer el texto interno de la excepción"""
+    if isinstance(e, ValueError):
+        # Parámetros de consulta inválidos (p. ej. limit=abc)
+        return jsonify({'error': 'invalid request'}), 400
+    app.logger.error('%s: %s', type(e).__name__, e)
+    return jsonify({'error': 'internal error'}), 500
+
+# El contenido de la página de inicio es fijo: se serializa una sola vez
+HOME_BODY = orjson.dumps({
+    'service': 'Trading API Server',
+    'version': '1.0.0',
+    'status': 'running',
+    'endpoints': {
+        'stock_price': '/api/stock/price/<symbol>',
+        'stock_bars': '/api/stock/bars/<symbol>',
+        'account': '/api/account',
+        'positions': '/api/positions',
+        'orders': '/api/orders',
+        'market_status': '/api/market/status'
+    }
+})
+
 @app.route('/', methods=['GET'])
 def home():
     """Página de inicio con información de la API"""
-    return jsonify({
-        'service': 'Trading API Server',
-        'version': '1.0.0',
-        'status': 'running',
-        'endpoints': {
-            'stock_price': '/api/stock/price/<symbol>',
-            'stock_bars': '/api/stock/bars/<symbol>',
-            'account': '/api/account',
-            'positions': '/api/positions',
-            'orders': '/api/orders',
-            'market_status': '/api/market/status'
-        }
-    })
+    return app.response_class(
+        HOME_BODY,
+        mimetype='application/json',
+        headers={'Cache-Control': 'public, max-age=3600'}
+    )
+
+def _parse_symbols():
+    """Lista de símbolos del parámetro ?symbols=A,B,C (en mayúsculas)"""
+    return [s.strip().upper() for s in request.args['symbols'].split(',') if s.strip()]
+
+def _trade_to_dict(symbol: str, trade: TradeV2) -> Dict[str, Any]:
+    return {
+        'symbol': symbol,
+        'price': float(trade.price),
+        'timestamp': trade.timestamp.isoformat(),
+        'size': int(trade.size),
+        'exchange': trade.exchange
+    }
+
+def _quote_to_dict(symbol: str, quote: QuoteV2) -> Dict[str, Any]:
+    return {
+        'symbol': symbol,
+        'bid_price': float(quote.bid_price),
+        'bid_size': int(quote.bid_size),
+        'ask_price': float(quote.ask_price),
+        'ask_size': int(quote.ask_size),
+        'timestamp': quote.timestamp.isoformat()
+    }
 
 @app.route('/api/stock/price/<symbol>', methods=['GET'])
 def get_stock_price(symbol):
     """
-    Obtiene el precio actual de una acción
+    Obtiene el precio actual de una o varias acciones
     Ejemplo: GET /api/stock/price/AAPL
+    Ejemplo: GET /api/stock/price/AAPL?symbols=AAPL,MSFT,TSLA
+    
+    Parámetros:
+    - symbols: lista separada por comas; se obtiene en una sola llamada a Alpaca
     """
     try:
-        # Obtener última cotización
-        quote = alpaca.get_latest_trade(symbol)
+        if 'symbols' not in request.args:
+            # Obtener última cotización
+            quote = _latest_trade(symbol.upper())
+            
+            return jsonify(_trade_to_dict(symbol.upper(), quote))
+        
+        trades = _latest_trades(_parse_symbols())
         
         return jsonify({
-            'symbol': symbol.upper(),
-            'price': float(quote.price),
-            'timestamp': quote.timestamp.isoformat(),
-            'size': int(quote.size),
-            'exchange': quote.exchange
+            'count': len(trades),
+            'prices': {s: _trade_to_dict(s, t) for s, t in trades.items()}
         })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
 
 @app.route('/api/stock/quote/<symbol>', methods=['GET'])
 def get_stock_quote(symbol):
     """
-    Obtiene la cotización completa (bid/ask) de una acción
+    Obtiene la cotización completa (bid/ask) de una o varias acciones
     Ejemplo: GET /api/stock/quote/AAPL
+    Ejemplo: GET /api/stock/quote/AAPL?symbols=AAPL,MSFT,TSLA
+    
+    Parámetros:
+    - symbols: lista separada por comas; se obtiene en una sola llamada a Alpaca
     """
     try:
-        quote = alpaca.get_latest_quote(symbol)
+        if 'symbols' not in request.args:
+            quote = _single_flight(('quote', symbol.upper()), alpaca.get_latest_quote, symbol.upper())
+            
+            return jsonify(_quote_to_dict(symbol.upper(), quote))
+        
+        quotes = alpaca.get_latest_quotes(_parse_symbols())
         
         return jsonify({
-            'symbol': symbol.upper(),
-            'bid_price': float(quote.bid_price),
-            'bid_size': int(quote.bid_size),
-            'ask_price': float(quote.ask_price),
-            'ask_size': int(quote.ask_size),
-            'timestamp': quote.timestamp.isoformat()
+            'count': len(quotes),
+            'quotes': {s: _quote_to_dict(s, q) for s, q in quotes.items()}
         })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+BAR_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'int64'
+}
+
+def _bars_to_list(bars):
+    """Convierte un DataFrame de barras de Alpaca a una lista JSON amigable"""
+    # Sin barras (fin de semana, pre-mercado) el DataFrame no tiene columnas
+    if bars.empty:
+        return []
+    
+    # Conversión vectorizada (sin iterrows) de columnas y timestamps
+    data = bars[list(BAR_DTYPES)].astype(BAR_DTYPES)
+    data.insert(0, 'timestamp', bars.index.tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%S+00:00'))
+    return data.to_dict('records')
+
+# En alpaca_trade_api el `limit` de get_bars es global para todos los símbolos
+# de la llamada (y las páginas vienen ordenadas por símbolo), así que una sola
+# llamada multi-símbolo puede gastar todo el límite en el primero. Cada símbolo
+# se pide por separado con su propio límite, en paralelo. El número de símbolos
+# por petición está acotado para no agotar el rate limit de Alpaca.
+MAX_BAR_SYMBOLS = 10
+BAR_FETCH_CONCURRENCY = 4
+
+def _fetch_bars(symbols, timeframe, limit):
+    """DataFrames de barras por símbolo, con hasta `limit` barras cada uno"""
+    # Un pool propio por petición: una petición grande no retrasa a las demás
+    with ThreadPoolExecutor(max_workers=min(BAR_FETCH_CONCURRENCY, len(symbols))) as executor:
+        frames = list(executor.map(
+            lambda s: alpaca.get_bars(s, timeframe, limit=limit).df.head(limit),
+            symbols
+        ))
+    return dict(zip(symbols, frames))
+
+# Cuerpos JSON de barras ya serializados, indexados por su ETag
+bars_cache = LRUCache(maxsize=256)
+bars_lock = threading.Lock()
+
+def _bars_etag(symbols: List[str], timeframe: str, limit: int, last_bars: str, multi: bool) -> str:
+    """ETag de una respuesta de barras a partir de sus parámetros y las últimas barras"""
+    key = f"{','.join(symbols)}|{timeframe}|{limit}|{last_bars}|{int(multi)}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+def _matching_etag(etag):
+    """
+    Variante del ETag que envía el cliente en If-None-Match, o None
+    
+    Flask-Compress añade el algoritmo al ETag de las respuestas comprimidas
+    (W/"<etag>:br"), así que el cliente devuelve esa forma y no la original.
+    """
+    variants = [etag] + [f'{etag}:{algorithm}' for algorithm in app.config['COMPRESS_ALGORITHM']]
+    for variant in variants:
+        if request.if_none_match.contains_weak(variant):
+            return variant
+    return None
+
+def _last_bar_key(bars):
+    """Timestamp, cierre y volumen de la última barra (la que sigue cambiando mientras está abierta)"""
+    if bars.empty:
+        return ''
+    last = bars.iloc[-1]
+    return f"{bars.index[-1].isoformat()}/{last['close']}/{last['volume']}"
+
+TIMEFRAME_RE = re.compile(r'^(\d+)(Min|T|Hour|H|Day|D|Week|W|Month|M)$')
+TIMEFRAME_UNITS = {
+    'Min': timedelta(minutes=1), 'T': timedelta(minutes=1),
+    'Hour': timedelta(hours=1), 'H': timedelta(hours=1),
+    'Day': timedelta(days=1), 'D': timedelta(days=1),
+    'Week': timedelta(weeks=1), 'W': timedelta(weeks=1),
+    'Month': timedelta(days=31), 'M': timedelta(days=31)
+}
+
+def _bars_closed(bars, timeframe):
+    """True si la última barra ya cerró y su contenido no puede cambiar"""
+    match = TIMEFRAME_RE.match(timeframe)
+    if bars.empty or match is None:
+        return False
+    duration = int(match.group(1)) * TIMEFRAME_UNITS[match.group(2)]
+    return bars.index[-1] + duration <= datetime.now(timezone.utc)
 
 @app.route('/api/stock/bars/<symbol>', methods=['GET'])
 def get_stock_bars(symbol):
     """
-    Obtiene datos históricos de una acción
+    Obtiene datos históricos de una o varias acciones
     Ejemplo: GET /api/stock/bars/AAPL?timeframe=1Hour&limit=10
+    Ejemplo: GET /api/stock/bars/AAPL?symbols=AAPL,MSFT,TSLA
     
     Parámetros:
     - timeframe: 1Min, 5Min, 15Min, 1Hour, 1Day (default: 1Hour)
-    - limit: número de barras (default: 10, max: 100)
+    - limit: número de barras por símbolo (default: 10, max: 100)
+    - symbols: lista separada por comas (max: 10); los símbolos se consultan en paralelo
     """
     try:
         timeframe = request.args.get('timeframe', '1Hour')
         limit = min(int(request.args.get('limit', 10)), 100)
+        multi = 'symbols' in request.args
         
-        bars = alpaca.get_bars(symbol, timeframe, limit=limit).df
+        if multi:
+            symbols = list(dict.fromkeys(_parse_symbols()))
+            if not symbols or len(symbols) > MAX_BAR_SYMBOLS:
+                return jsonify({'error': f'symbols debe tener entre 1 y {MAX_BAR_SYMBOLS} símbolos'}), 400
+            frames = _fetch_bars(symbols, timeframe, limit)
+        else:
+            symbols = [symbol.upper()]
+            frames = {symbols[0]: alpaca.get_bars(symbol, timeframe, limit=limit).df}
         
-        # Convertir a formato JSON amigable
-        data = []
-        for index, row in bars.iterrows():
-            data.append({
-                'timestamp': index.isoformat(),
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': int(row['volume'])
-            })
+        # Si la última barra de cada símbolo es la misma que ya tiene el cliente
+        # (incluido su cierre y volumen, que cambian mientras está abierta),
+        # se responde 304 sin volver a serializar
+        last_bars = ','.join(_last_bar_key(frames[s]) for s in symbols)
+        etag = _bars_etag(symbols, timeframe, limit, last_bars, multi)
+        matched = _matching_etag(etag)
+        if matched is not None:
+            response = app.response_class(status=304)
+            response.set_etag(matched, weak=True)
+            return response
         
-        return jsonify({
-            'symbol': symbol.upper(),
-            'timeframe': timeframe,
-            'count': len(data),
-            'data': data
-        })
+        def build():
+            if not multi:
+                data = _bars_to_list(frames[symbols[0]])
+                return {
+                    'symbol': symbols[0],
+                    'timeframe': timeframe,
+                    'count': len(data),
+                    'data': data
+                }
+            
+            data = {s: _bars_to_list(frames[s]) for s in symbols}
+            
+            return {
+                'symbols': symbols,
+                'timeframe': timeframe,
+                'count': sum(len(v) for v in data.values()),
+                'data': data
+            }
+        
+        # Solo se guarda en caché el cuerpo cuando ninguna barra puede cambiar ya
+        if all(_bars_closed(frames[s], timeframe) for s in symbols):
+            response = _cached_json(bars_cache, bars_lock, etag, build)
+        else:
+            response = jsonify(build())
+        response.set_etag(etag, weak=True)
+        return response
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
 
 @app.route('/api/account', methods=['GET'])
 def get_account():
@@ -145,8 +483,63 @@ def get_account():
             'transfers_blocked': account.transfers_blocked,
             'account_blocked': account.account_blocked
         })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+POSITION_FIELDS = (
+    'symbol', 'qty', 'side', 'avg_entry_price', 'current_price', 'market_value',
+    'cost_basis', 'unrealized_pl', 'unrealized_plpc', 'unrealized_intraday_pl',
+    'unrealized_intraday_plpc'
+)
+POSITION_FLOAT_FIELDS = tuple(f for f in POSITION_FIELDS if f not in ('symbol', 'side'))
+POSITION_PERCENT_FIELDS = ('unrealized_plpc', 'unrealized_intraday_plpc')
+
+ORDER_FIELDS = (
+    'id', 'symbol', 'qty', 'filled_qty', 'side', 'type', 'time_in_force',
+    'limit_price', 'stop_price', 'status', 'created_at', 'updated_at',
+    'filled_at', 'filled_avg_price'
+)
+ORDER_FLOAT_FIELDS = ('qty', 'filled_qty', 'limit_price', 'stop_price', 'filled_avg_price')
+ORDER_DATE_FIELDS = ('created_at', 'updated_at', 'filled_at')
+
+def _to_records(
+    entities: Sequence[Any],
+    fields: Sequence[str],
+    float_fields: Sequence[str] = (),
+    percent_fields: Sequence[str] = (),
+    date_fields: Sequence[str] = ()
+) -> List[Dict[str, Any]]:
+    """
+    Convierte entidades de Alpaca a una lista de dicts JSON amigables
+    
+    Los atributos se extraen de una vez con attrgetter y todas las columnas
+    numéricas se convierten a float (y a porcentaje) como un único bloque NumPy.
+    Los valores vacíos se devuelven como None.
+    """
+    if not entities:
+        return []
+    
+    rows = np.array(list(map(attrgetter(*fields), entities)), dtype=object)
+    
+    if float_fields:
+        # Todo el bloque numérico se convierte en una sola operación
+        columns = [fields.index(name) for name in float_fields]
+        block = rows[:, columns]
+        missing = (block == None) | (block == '')  # noqa: E711
+        values = np.where(missing, np.nan, block).astype(np.float64)
+        if percent_fields:
+            values[:, [float_fields.index(name) for name in percent_fields]] *= 100  # Convertir a porcentaje
+        values = values.astype(object)
+        values[missing] = None
+        rows[:, columns] = values
+    
+    for name in date_fields:
+        i = fields.index(name)
+        rows[:, i] = [d.isoformat() if d else None for d in rows[:, i]]
+    
+    return [dict(zip(fields, row)) for row in rows.tolist()]
 
 @app.route('/api/positions', methods=['GET'])
 def get_positions():
@@ -157,28 +550,33 @@ def get_positions():
     try:
         positions = alpaca.list_positions()
         
-        result = []
-        for position in positions:
-            result.append({
-                'symbol': position.symbol,
-                'qty': float(position.qty),
-                'side': position.side,
-                'avg_entry_price': float(position.avg_entry_price),
-                'current_price': float(position.current_price),
-                'market_value': float(position.market_value),
-                'cost_basis': float(position.cost_basis),
-                'unrealized_pl': float(position.unrealized_pl),
-                'unrealized_plpc': float(position.unrealized_plpc) * 100,  # Convertir a porcentaje
-                'unrealized_intraday_pl': float(position.unrealized_intraday_pl),
-                'unrealized_intraday_plpc': float(position.unrealized_intraday_plpc) * 100
-            })
+        result = _to_records(
+            positions, POSITION_FIELDS,
+            float_fields=POSITION_FLOAT_FIELDS,
+            percent_fields=POSITION_PERCENT_FIELDS
+        )
         
         return jsonify({
             'count': len(result),
             'positions': result
         })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+def _position_to_dict(position: Position) -> Dict[str, Any]:
+    return {
+        'symbol': position.symbol,
+        'qty': float(position.qty),
+        'side': position.side,
+        'avg_entry_price': float(position.avg_entry_price),
+        'current_price': float(position.current_price),
+        'market_value': float(position.market_value),
+        'cost_basis': float(position.cost_basis),
+        'unrealized_pl': float(position.unrealized_pl),
+        'unrealized_plpc': float(position.unrealized_plpc) * 100
+    }
 
 @app.route('/api/positions/<symbol>', methods=['GET'])
 def get_position(symbol):
@@ -189,19 +587,11 @@ def get_position(symbol):
     try:
         position = alpaca.get_position(symbol)
         
-        return jsonify({
-            'symbol': position.symbol,
-            'qty': float(position.qty),
-            'side': position.side,
-            'avg_entry_price': float(position.avg_entry_price),
-            'current_price': float(position.current_price),
-            'market_value': float(position.market_value),
-            'cost_basis': float(position.cost_basis),
-            'unrealized_pl': float(position.unrealized_pl),
-            'unrealized_plpc': float(position.unrealized_plpc) * 100
-        })
+        return jsonify(_position_to_dict(position))
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 404
+        return _internal_error(e)
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
@@ -219,31 +609,33 @@ def get_orders():
         
         orders = alpaca.list_orders(status=status, limit=limit)
         
-        result = []
-        for order in orders:
-            result.append({
-                'id': order.id,
-                'symbol': order.symbol,
-                'qty': float(order.qty),
-                'filled_qty': float(order.filled_qty),
-                'side': order.side,
-                'type': order.type,
-                'time_in_force': order.time_in_force,
-                'limit_price': float(order.limit_price) if order.limit_price else None,
-                'stop_price': float(order.stop_price) if order.stop_price else None,
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat() if order.updated_at else None,
-                'filled_at': order.filled_at.isoformat() if order.filled_at else None,
-                'filled_avg_price': float(order.filled_avg_price) if order.filled_avg_price else None
-            })
+        # Sin streaming: list_orders ya devuelve la lista completa, y convertirla
+        # antes de responder mantiene los errores en 400 y permite comprimir
+        result = _to_records(
+            orders, ORDER_FIELDS,
+            float_fields=ORDER_FLOAT_FIELDS,
+            date_fields=ORDER_DATE_FIELDS
+        )
         
         return jsonify({
             'count': len(result),
             'orders': result
         })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+def _market_status():
+    """Consulta el reloj del mercado en Alpaca"""
+    clock = alpaca.get_clock()
+    
+    return {
+        'is_open': clock.is_open,
+        'timestamp': clock.timestamp.isoformat(),
+        'next_open': clock.next_open.isoformat(),
+        'next_close': clock.next_close.isoformat()
+    }
 
 @app.route('/api/market/status', methods=['GET'])
 def get_market_status():
@@ -252,16 +644,37 @@ def get_market_status():
     Ejemplo: GET /api/market/status
     """
     try:
-        clock = alpaca.get_clock()
-        
-        return jsonify({
-            'is_open': clock.is_open,
-            'timestamp': clock.timestamp.isoformat(),
-            'next_open': clock.next_open.isoformat(),
-            'next_close': clock.next_close.isoformat()
-        })
+        return _cached_json(clock_cache, clock_lock, 'clock', _market_status)
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+def _market_calendar(start, end):
+    """Consulta el calendario del mercado en Alpaca"""
+    calendar = alpaca.get_calendar(start=start, end=end)
+    
+    result = [
+        {'date': day.date.isoformat(), 'open': day.open, 'close': day.close}
+        for day in calendar
+    ]
+    
+    return {
+        'count': len(result),
+        'calendar': result
+    }
+
+@lru_cache(maxsize=32)
+def _calendar_range(minute, days):
+    """
+    Fechas (inicio, fin) del calendario como texto 'YYYY-MM-DD'
+    
+    `minute` es el minuto actual (time.time() // 60): solo forma parte de la
+    clave de caché, de modo que las fechas se recalculan como mucho una vez
+    por minuto para cada valor de `days`.
+    """
+    now = datetime.now()
+    return now.strftime('%Y-%m-%d'), (now + timedelta(days=days)).strftime('%Y-%m-%d')
 
 @app.route('/api/market/calendar', methods=['GET'])
 def get_market_calendar():
@@ -273,31 +686,34 @@ def get_market_calendar():
     - days: número de días a obtener (default: 7)
     """
     try:
-        from datetime import timedelta
-        
         days = min(int(request.args.get('days', 7)), 30)
-        start = datetime.now()
-        end = start + timedelta(days=days)
+        start, end = _calendar_range(int(time.time() // 60), days)
         
-        calendar = alpaca.get_calendar(
-            start=start.strftime('%Y-%m-%d'),
-            end=end.strftime('%Y-%m-%d')
+        return _cached_json(
+            calendar_cache, calendar_lock, (start, days),
+            lambda: _market_calendar(start, end)
         )
-        
-        result = []
-        for day in calendar:
-            result.append({
-                'date': day.date.isoformat(),
-                'open': day.open,
-                'close': day.close
-            })
-        
-        return jsonify({
-            'count': len(result),
-            'calendar': result
-        })
+    except APIError as e:
+        return _api_error(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return _internal_error(e)
+
+def prewarm_alpaca():
+    """
+    Abre en segundo plano las conexiones con Alpaca (DNS + TCP + TLS), tanto
+    con la API de trading como con la de datos, para que la primera petición
+    de un usuario no pague ese coste
+    """
+    def warm():
+        # El reloj va a paper-api.alpaca.markets; precios, cotizaciones y barras
+        # van a data.alpaca.markets, que tiene su propio pool de conexiones
+        for call in (alpaca.get_clock, lambda: alpaca.get_latest_trade('SPY')):
+            try:
+                call()
+            except Exception:
+                pass
+    
+    threading.Thread(target=warm, daemon=True).start()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -321,7 +737,8 @@ if __name__ == '__main__':
     print("🚀 Trading API Server")
     print("=" * 60)
     print(f"📊 Conectado a: {ALPACA_BASE_URL}")
-    print(f"🌐 Servidor corriendo en: http://localhost:5000")
+    print(f"🌐 Servidor de desarrollo en: http://localhost:5000")
+    print("   (en producción usar: gunicorn -c gunicorn.conf.py trading_api_server:app)")
     print("\n📋 Endpoints disponibles:")
     print("  - GET  /                              (Info de la API)")
     print("  - GET  /health                        (Health check)")
@@ -340,5 +757,8 @@ if __name__ == '__main__':
     print("   export ALPACA_SECRET_KEY='tu_secret'")
     print("=" * 60)
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    prewarm_alpaca()
+    
+    # Solo para desarrollo local; en producción se sirve con Gunicorn + gevent
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG') == '1')
 